@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Dict, Iterable, Optional
+from database import DB_POOL_SIZE
+import asyncio
+import math
+import os
+import time
+
+# Per-user token bucket: sustained requests per second and burst size
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "5"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "20"))
+# Requests allowed to hold a DB connection at once; defaults to the pool size
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(DB_POOL_SIZE)))
+# Requests waiting for a slot, and how long they may wait before being shed
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", str(ADMISSION_MAX_CONCURRENCY * 4)))
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "500"))
+# At most this many buckets are kept; the least recently seen client is
+# dropped first (it starts again with a full bucket)
+MAX_TRACKED_CLIENTS = 10000
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        # Returns 0 when a token was taken, otherwise seconds until one is available
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class AdmissionController:
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: int = RATE_LIMIT_BURST,
+        max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.in_flight = 0
+        self.queued = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.counters = {
+            "admitted": 0,
+            "rate_limited": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+        }
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "tracked_clients": len(self.buckets),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+        }
+
+    def check_rate(self, client: str) -> float:
+        now = time.monotonic()
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            while len(self.buckets) >= MAX_TRACKED_CLIENTS:
+                self.buckets.popitem(last=False)
+            bucket = self.buckets[client] = TokenBucket(self.rate, self.burst, now)
+        else:
+            self.buckets.move_to_end(client)
+        wait = bucket.take(now)
+        if wait:
+            self.counters["rate_limited"] += 1
+        return wait
+
+    async def acquire(self) -> Optional[str]:
+        # Returns None once a slot is held, otherwise the reason it was shed
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            if self.queued >= self.max_queue:
+                self.counters["shed_queue_full"] += 1
+                return "queue_full"
+            self.queued += 1
+            try:
+                async with asyncio.timeout(self.queue_timeout):
+                    await self._slots.acquire()
+            except TimeoutError:
+                self.counters["shed_deadline"] += 1
+                return "deadline"
+            finally:
+                self.queued -= 1
+        self.in_flight += 1
+        self.counters["admitted"] += 1
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, controller: AdmissionController, exempt_paths: Iterable[str] = ()):
+        self.app = app
+        self.controller = controller
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        client = self._client_key(scope)
+        wait = self.controller.check_rate(client) if client else 0
+        if wait:
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+
+        shed = await self.controller.acquire()
+        if shed:
+            response = JSONResponse(
+                {"detail": "Service overloaded, please retry"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    @staticmethod
+    def _client_key(scope: Scope) -> Optional[str]:
+        # Behind nginx/OpenResty "client" is the real address only when
+        # uvicorn runs with --proxy-headers and trusts the proxy (see the
+        # Dockerfile); without any address the request is not rate limited
+        # rather than sharing one bucket with every other such request
+        for name, value in scope.get("headers", []):
+            if name == b"x-user-id" and value:
+                return "user:" + value.decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + client[0] if client else None
@@ -0,0 +1,69 @@
+"""Measure cold-start time: process launch to first successful request.
+
+Starts the service with uvicorn and polls a URL until it answers 200.
+Use /readyz (the default) against a real database, /healthz to time only
+the process and warmup, or an API path to time a first real request.
+
+    python benchmarks/cold_start.py [--path /readyz] [--runs 3]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure(path, timeout):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    first_response = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return first_response or time.perf_counter() - start, time.perf_counter() - start
+            except urllib.error.HTTPError:
+                # Serving, but not ready yet
+                first_response = first_response or time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"{url} did not answer 200 within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/readyz")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    for run in range(1, args.runs + 1):
+        first_response, first_success = measure(args.path, args.timeout)
+        print(f"run {run}: first response {first_response * 1000:7.0f} ms, first 200 on {args.path} {first_success * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+-- Cold storage for Completed / Rejected / Canceled applications.
+-- Filled by POST /api/apply/archive; the hot `applications` table keeps only live rows.
+-- The PARTITION BY clause is optional: it lets old years be dropped or moved cheaply.
+-- MySQL requires the partition column in every unique key, hence (id, apply_date).
+CREATE TABLE IF NOT EXISTS applications_archive (
+    id VARCHAR(36) NOT NULL,
+    type VARCHAR(20) NOT NULL,
+    base_form JSON NOT NULL,
+    extra_form JSON,
+    apply_date DATE NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Lets /my-applications?include_archived=true use an index instead of
+    -- running JSON_EXTRACT over the whole (ever growing) archive
+    applicant_account VARCHAR(64)
+        AS (JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.applicant_account'))) STORED,
+    PRIMARY KEY (id, apply_date),
+    KEY idx_applications_archive_id (id),
+    KEY idx_applications_archive_applicant_account (applicant_account)
+)
+PARTITION BY RANGE (YEAR(apply_date)) (
+    PARTITION p2024 VALUES LESS THAN (2025),
+    PARTITION p2025 VALUES LESS THAN (2026),
+    PARTITION p2026 VALUES LESS THAN (2027),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Add a new yearly partition before pmax fills up, e.g.
+-- ALTER TABLE applications_archive REORGANIZE PARTITION pmax INTO (
+--     PARTITION p2027 VALUES LESS THAN (2028),
+--     PARTITION pmax VALUES LESS THAN MAXVALUE
+-- );
+
+-- For an archive table created before applicant_account existed:
+-- ALTER TABLE applications_archive
+--     ADD COLUMN applicant_account VARCHAR(64)
+--         AS (JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.applicant_account'))) STORED,
+--     ADD KEY idx_applications_archive_applicant_account (applicant_account);
@@ -0,0 +1,15 @@
+-- Index of live DNS domain requests, maintained by the apply service on
+-- create / update / cancel / approve / reject / delete.
+-- reversed_name is label-reversed with a trailing dot
+-- ("lab.ie.example.edu" -> "edu.example.ie.lab.") so that parent zones are
+-- point lookups and subdomains are a prefix range scan on the same index.
+-- Rejected and Canceled requests are removed, so a live name is unique.
+CREATE TABLE IF NOT EXISTS dns_domains (
+    application_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    domain_name VARCHAR(255) NOT NULL,
+    reversed_name VARCHAR(255) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    UNIQUE KEY uq_dns_domains_reversed_name (reversed_name)
+);
+
+-- Populate from existing applications with POST /api/apply/domain-conflicts/rebuild
@@ -0,0 +1,36 @@
+-- Full-text index behind GET /api/apply/search, maintained by create / update /
+-- delete / archive. Holds one row per application in the hot table.
+-- Note: the default parser splits on spaces and punctuation; switch to
+-- WITH PARSER ngram if names are mostly CJK (prefix `term*` matching then
+-- behaves differently).
+--
+-- Requires these server settings, in my.cnf under [mysqld]:
+--     innodb_ft_min_token_size = 1
+--     innodb_ft_enable_stopword = OFF
+-- /search makes every term in the query mandatory, so with the defaults
+-- (3 and ON) short labels and stopwords such as `cs`, `ie`, `www.x.com` or
+-- "CS Department" are never indexed and the whole search finds nothing.
+-- Both are read when the index is built: after changing them, rebuild it with
+--     ALTER TABLE application_search DROP INDEX ft_application_search_content;
+--     ALTER TABLE application_search ADD FULLTEXT KEY ft_application_search_content (content);
+CREATE TABLE IF NOT EXISTS application_search (
+    application_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    content TEXT NOT NULL,
+    FULLTEXT KEY ft_application_search_content (content)
+) ENGINE=InnoDB;
+
+-- Backfill from existing applications. Keep the field list in sync with
+-- BASE_SEARCH_FIELDS / EXTRA_SEARCH_FIELDS in routers/apply.py.
+REPLACE INTO application_search (application_id, content)
+SELECT id, CONCAT_WS(' ',
+    JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.applicant_name')),
+    JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.applicant_account')),
+    JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.department')),
+    JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.tech_contact_name')),
+    JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.supervisor_name')),
+    JSON_UNQUOTE(JSON_EXTRACT(extra_form, '$.applicant_unit')),
+    JSON_UNQUOTE(JSON_EXTRACT(extra_form, '$.domain_name')),
+    JSON_UNQUOTE(JSON_EXTRACT(extra_form, '$.application_project')),
+    JSON_UNQUOTE(JSON_EXTRACT(extra_form, '$.reason'))
+)
+FROM applications;
@@ -1,6 +1,82 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from routers import apply
+from admission import AdmissionController, AdmissionMiddleware
+from models import GeneralApplicationRequest, ApplicationResponse, dnsApplicationForm
+import database
+import time
 
-app = FastAPI(title="Apply Service")
+# Run through the request models once so the first real request doesn't pay
+# for lazy validator setup (e.g. email_validator's first call)
+WARMUP_APPLICATION = {
+    "application_type": "DNS",
+    "baseForm": {
+        "department": "Warmup",
+        "applicant_account": "warmup",
+        "applicant_name": "Warmup",
+        "applicant_phone": "0900000000",
+        "applicant_email": "warmup@example.edu",
+        "tech_contact_name": "Warmup",
+        "tech_contact_phone": "0900000000",
+        "tech_contact_email": "warmup@example.edu",
+        "supervisor_name": "Warmup",
+        "supervisor_id": "A000000000",
+        "supervisor_email": "warmup@example.edu",
+        "apply_date": "2025-01-01"
+    },
+    "additionForm": {
+        "applicant_unit": "Warmup",
+        "domain_name": "warmup.example.edu",
+        "application_project": "Warmup",
+        "dns_manage_account": "warmup",
+        "reason": "Warmup"
+    }
+}
+
+def warm_up_validators():
+    request = GeneralApplicationRequest(**WARMUP_APPLICATION)
+    request.baseForm.json()
+    dnsApplicationForm(**request.additionForm).json()
+    ApplicationResponse(application_id="warmup", message="warmup").json()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    warm_up_validators()
+    await run_in_threadpool(database.warm_up_pools)
+    app.state.ready = True
+    print(f"Startup warmup finished in {(time.perf_counter() - start) * 1000:.0f} ms")
+    yield
+    app.state.ready = False
+
+app = FastAPI(title="Apply Service", lifespan=lifespan)
+app.state.ready = False
+
+admission = AdmissionController()
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission,
+    exempt_paths=["/admission/stats", "/healthz", "/readyz"]
+)
 
 app.include_router(apply.router, prefix="/api/apply", tags=["Apply"])
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+# Liveness: the process is up and serving
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+# Readiness: warmup is done and the primary answers a ping
+@app.get("/readyz")
+async def readyz():
+    if not app.state.ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if not await run_in_threadpool(database.ping_primary):
+        return JSONResponse({"status": "database unreachable"}, status_code=503)
+    return {"status": "ready"}
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from enum import Enum
+from typing import Any, Dict, List
 
 class ApplicationStatus(str, Enum):
     pending = "Pending"
@@ -40,6 +41,30 @@ class ApplicationResponse(BaseModel):
     application_id: str
     message: str
 
+class ArchiveResponse(BaseModel):
+    archived: int
+    skipped: int # terminal rows left in place because apply_date can't be parsed
+    cutoff_date: str
+    message: str
+
+class DomainClaim(BaseModel):
+    application_id: str
+    domain_name: str
+    status: str
+
+class DomainConflictResponse(BaseModel):
+    domain_name: str
+    exact: List[DomainClaim]
+    parent_zones: List[DomainClaim] # approved zones containing the domain
+    subdomains: List[DomainClaim] # requests inside the domain
+
+class SearchResponse(BaseModel):
+    query: str
+    page: int
+    page_size: int
+    has_more: bool
+    results: List[Dict[str, Any]] # application_id, type, base, extra, score
+
 class dnsApplicationForm(BaseModel):
     applicant_unit: str
     domain_name: str
@@ -1,37 +1,167 @@
-from fastapi import APIRouter, HTTPException, Request
-from models import ApplicationForm, ApplicationType, GeneralApplicationRequest, ApplicationResponse, dnsApplicationForm, ApplicationStatus
+from fastapi import APIRouter, HTTPException, Request, Response
+from models import ApplicationForm, ApplicationType, GeneralApplicationRequest, ApplicationResponse, dnsApplicationForm, ApplicationStatus, ArchiveResponse, DomainConflictResponse, SearchResponse
 from uuid import uuid4, UUID
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+from datetime import date, timedelta
+from database import get_db_connection, is_valid_consistency_token, set_consistency_token, set_statement_timeout, database_error, run_query, CONSISTENCY_HEADER
 import mysql.connector
 import json
+import os
+import re
 
 router = APIRouter()
 
-def get_db_connection():
+# Finished applications older than this are moved to applications_archive
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+TERMINAL_STATUSES = (
+    ApplicationStatus.completed.value,
+    ApplicationStatus.rejected.value,
+    ApplicationStatus.canceled.value,
+)
+# Statuses whose domain counts as a delegated zone for overlap checks
+ZONE_STATUSES = (
+    ApplicationStatus.approved.value,
+    ApplicationStatus.completed.value,
+)
+# Statuses that give the requested domain up again
+RELEASED_STATUSES = (
+    ApplicationStatus.rejected.value,
+    ApplicationStatus.canceled.value,
+)
+# Form fields copied into application_search for full-text lookups
+BASE_SEARCH_FIELDS = ("applicant_name", "applicant_account", "department", "tech_contact_name", "supervisor_name")
+EXTRA_SEARCH_FIELDS = ("applicant_unit", "domain_name", "application_project", "reason")
+SEARCH_MAX_PAGE_SIZE = 100
+# Per-endpoint statement timeouts (ms); long-running reads are also killed
+# when the client disconnects
+STATEMENT_TIMEOUTS_MS = {
+    "create": 2000,
+    "get_all": 10000,
+    "my_applications": 3000,
+    "domain_conflicts": 1000,
+    "search": 2000,
+    "get": 1000,
+    "update": 2000,
+    "status": 2000,
+    "delete": 2000,
+    "archive": 60000,
+    "rebuild_domain_index": 60000,
+}
+
+def get_read_connection(request: Request):
+    # The token is client input; one that isn't a GTID set can't come from us
+    consistency_token = request.headers.get(CONSISTENCY_HEADER)
+    if consistency_token and not is_valid_consistency_token(consistency_token):
+        consistency_token = None
+    return get_db_connection(read_only=True, consistency_token=consistency_token)
+
+# Domain index helpers
+# dns_domains stores names label-reversed with a trailing dot
+# ("lab.ie.example.edu" -> "edu.example.ie.lab."), so parent zones are exact
+# keys and subdomains are a prefix range on the same B-tree index.
+def normalize_domain(domain_name: str) -> str:
+    domain = domain_name.strip().lower().rstrip(".")
+    if not domain or len(domain) > 253 or "" in domain.split("."):
+        raise HTTPException(status_code=400, detail=f"Invalid domain name: {domain_name}")
+    return domain
+
+def reverse_domain(domain_name: str) -> str:
+    return ".".join(reversed(normalize_domain(domain_name).split("."))) + "."
+
+def parent_zones(domain_name: str) -> List[str]:
+    labels = reverse_domain(domain_name).split(".")[:-1]
+    return [".".join(labels[:i]) + "." for i in range(1, len(labels))]
+
+def _like_prefix(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def find_domain_conflicts(cursor, domain_name: str, exclude_application_id: Optional[str] = None, for_update: bool = False) -> Dict[str, List[Dict[str, str]]]:
+    reversed_name = reverse_domain(domain_name)
+    parents = parent_zones(domain_name)
+    conditions = ["reversed_name = %s", "reversed_name LIKE %s"]
+    values: List[Any] = [reversed_name, _like_prefix(reversed_name)]
+    if parents:
+        conditions.append(f"reversed_name IN ({', '.join(['%s'] * len(parents))})")
+        values.extend(parents)
+    query = f"""
+        SELECT application_id, domain_name, reversed_name, status
+        FROM dns_domains
+        WHERE ({' OR '.join(conditions)})
+    """
+    if exclude_application_id:
+        query += " AND application_id <> %s"
+        values.append(exclude_application_id)
+    if for_update:
+        # Lock the matching index ranges so overlapping approvals serialize
+        query += " FOR UPDATE"
+    cursor.execute(query, tuple(values))
+
+    conflicts = {"exact": [], "parent_zones": [], "subdomains": []}
+    for application_id, name, row_reversed, status in cursor.fetchall():
+        claim = {"application_id": application_id, "domain_name": name, "status": status}
+        if row_reversed == reversed_name:
+            conflicts["exact"].append(claim)
+        elif row_reversed in parents:
+            conflicts["parent_zones"].append(claim)
+        else:
+            conflicts["subdomains"].append(claim)
+    return conflicts
+
+def check_domain_available(cursor, domain_name: str, exclude_application_id: Optional[str] = None, for_update: bool = False):
+    conflicts = find_domain_conflicts(cursor, domain_name, exclude_application_id, for_update)
+    if conflicts["exact"]:
+        raise HTTPException(status_code=409, detail=f"Domain conflict: {domain_name} is already requested")
+    for claim in conflicts["parent_zones"] + conflicts["subdomains"]:
+        if claim["status"] in ZONE_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Domain conflict: {domain_name} overlaps approved zone {claim['domain_name']}")
+
+def index_domain(cursor, application_id: str, domain_name: str, status: str):
+    cursor.execute("DELETE FROM dns_domains WHERE application_id = %s", (application_id,))
+    if status in RELEASED_STATUSES:
+        return
+    query = """
+        INSERT INTO dns_domains (application_id, domain_name, reversed_name, status)
+        VALUES (%s, %s, %s, %s)
+    """
     try:
-        return mysql.connector.connect(
-            host="data-db-1",
-            port=3306,
-            user="user",
-            password="password",
-            database="appdb"
-        )
-    except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+        cursor.execute(query, (application_id, normalize_domain(domain_name), reverse_domain(domain_name), status))
+    except mysql.connector.IntegrityError:
+        # Lost a race with a concurrent request for the same name
+        raise HTTPException(status_code=409, detail=f"Domain conflict: {domain_name} is already requested")
+
+# Search index helpers
+def build_search_content(base_form: Dict[str, Any], extra_form: Dict[str, Any]) -> str:
+    values = [base_form.get(field) for field in BASE_SEARCH_FIELDS]
+    values += [extra_form.get(field) for field in EXTRA_SEARCH_FIELDS]
+    return " ".join(str(value) for value in values if value)
+
+def build_search_query(q: str) -> str:
+    # Every term must match, as a word prefix; boolean operators in the
+    # user input are dropped rather than interpreted. Short terms such as
+    # `cs` rely on the index settings in fake_data/search.sql
+    terms = re.findall(r"\w+", q)
+    return " ".join(f"+{term}*" for term in terms)
+
+def index_search(cursor, application_id: str, base_form: Dict[str, Any], extra_form: Dict[str, Any]):
+    query = "REPLACE INTO application_search (application_id, content) VALUES (%s, %s)"
+    cursor.execute(query, (application_id, build_search_content(base_form, extra_form)))
 
 # Create
 @router.post("/create", response_model=ApplicationResponse)
-async def create_application(request: GeneralApplicationRequest):
+async def create_application(request: GeneralApplicationRequest, response: Response):
     app_id = str(uuid4())
     if request.application_type == ApplicationType.dns:
         try:
             dns_form = dnsApplicationForm(**request.additionForm)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid DNS form: {str(e)}")
+        normalize_domain(dns_form.domain_name)
         # Save data to DB
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
+            set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["create"])
+            check_domain_available(cursor, dns_form.domain_name)
             query = """
             INSERT INTO applications (id, type, base_form, extra_form)
             VALUES (%s, %s, %s, %s)
@@ -43,9 +173,12 @@ async def create_application(request: GeneralApplicationRequest):
                 dns_form.json() 
             )
             cursor.execute(query, values)
+            index_domain(cursor, app_id, dns_form.domain_name, request.baseForm.status.value)
+            index_search(cursor, app_id, request.baseForm.dict(), dns_form.dict())
             conn.commit()
+            set_consistency_token(response, cursor)
         except mysql.connector.Error as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+            raise database_error(e)
         finally:
             cursor.close()
             conn.close()
@@ -59,14 +192,16 @@ async def create_application(request: GeneralApplicationRequest):
 
 # Read all
 @router.get("/getAll", response_model=Dict[str, Dict[str, Any]])
-async def get_all_applications():
+async def get_all_applications(request: Request, include_archived: bool = False):
     
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(request)
         cursor = conn.cursor(dictionary=True)
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["get_all"])
         query = "SELECT id, type, base_form, extra_form FROM applications"
-        cursor.execute(query)
-        results = cursor.fetchall()
+        if include_archived:
+            query += " UNION ALL SELECT id, type, base_form, extra_form FROM applications_archive"
+        results = await run_query(request, conn, cursor, query)
         
         applications = {}
         for row in results:
@@ -82,28 +217,37 @@ async def get_all_applications():
         return applications
     
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
 
 # Get application by student ID
 @router.get("/my-applications", response_model=List[Dict[str, Any]])
-async def get_applications_by_user(request: Request):
+async def get_applications_by_user(request: Request, include_archived: bool = False):
     user_id = request.headers.get("X-User-Id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Missing X-User-Id header")
 
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(request)
         cursor = conn.cursor(dictionary=True)
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["my_applications"])
         query = """
             SELECT id, type, base_form, extra_form 
             FROM applications 
             WHERE JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.applicant_account')) = %s
         """
-        cursor.execute(query, (user_id,))
-        rows = cursor.fetchall()
+        values = (user_id,)
+        if include_archived:
+            query += """
+            UNION ALL
+            SELECT id, type, base_form, extra_form
+            FROM applications_archive
+            WHERE applicant_account = %s
+            """
+            values = (user_id, user_id)
+        rows = await run_query(request, conn, cursor, query, values)
 
         if not rows:
             return []
@@ -120,21 +264,150 @@ async def get_applications_by_user(request: Request):
         return results
 
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
+    finally:
+        cursor.close()
+        conn.close()
+
+# Check a DNS domain against every live request and delegated zone
+@router.get("/domain-conflicts", response_model=DomainConflictResponse)
+async def get_domain_conflicts(request: Request, domain_name: str):
+    domain = normalize_domain(domain_name)
+    try:
+        conn = get_read_connection(request)
+        cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["domain_conflicts"])
+        conflicts = find_domain_conflicts(cursor, domain)
+    except mysql.connector.Error as e:
+        raise database_error(e)
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {"domain_name": domain, **conflicts}
+
+# Full-text search over applicant, project, reason and domain fields
+@router.get("/search", response_model=SearchResponse)
+async def search_applications(request: Request, q: str, page: int = 1, page_size: int = 20):
+    if page < 1 or not 1 <= page_size <= SEARCH_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"page must be >= 1 and page_size between 1 and {SEARCH_MAX_PAGE_SIZE}")
+    search_query = build_search_query(q)
+    if not search_query:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+
+    try:
+        conn = get_read_connection(request)
+        cursor = conn.cursor(dictionary=True)
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["search"])
+        query = """
+            SELECT a.id, a.type, a.base_form, a.extra_form,
+                   MATCH(s.content) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM application_search s
+            JOIN applications a ON a.id = s.application_id
+            WHERE MATCH(s.content) AGAINST (%s IN BOOLEAN MODE)
+            ORDER BY score DESC, a.id
+            LIMIT %s OFFSET %s
+        """
+        # One extra row tells us whether another page exists without a COUNT(*)
+        rows = await run_query(request, conn, cursor, query, (search_query, search_query, page_size + 1, (page - 1) * page_size))
+
+        results = []
+        for row in rows[:page_size]:
+            results.append({
+                "application_id": row["id"],
+                "type": row["type"],
+                "base": json.loads(row["base_form"]) if row["base_form"] else None,
+                "extra": json.loads(row["extra_form"]) if row["extra_form"] else None,
+                "score": float(row["score"])
+            })
+
+    except mysql.connector.Error as e:
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
 
+    return {
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "has_more": len(rows) > page_size,
+        "results": results
+    }
+
+# Rebuild dns_domains from the live DNS applications, hot and archived
+# Plain def so the per-row statements run in the threadpool
+@router.post("/domain-conflicts/rebuild", response_model=Dict[str, int])
+def rebuild_domain_index(response: Response):
+    released_placeholders = ", ".join(["%s"] * len(RELEASED_STATUSES))
+    # Archived Completed applications are still delegated zones
+    live_claims = f"""
+        SELECT id,
+               JSON_UNQUOTE(JSON_EXTRACT(extra_form, '$.domain_name')) AS domain_name,
+               JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.status')) AS status
+        FROM applications
+        WHERE type = %s AND JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.status')) NOT IN ({released_placeholders})
+        UNION ALL
+        SELECT id,
+               JSON_UNQUOTE(JSON_EXTRACT(extra_form, '$.domain_name')),
+               JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.status'))
+        FROM applications_archive
+        WHERE type = %s AND JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.status')) NOT IN ({released_placeholders})
+    """
+    live_values = (ApplicationType.dns.value, *RELEASED_STATUSES) * 2
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["rebuild_domain_index"])
+        # Drop rows whose application is gone or has given its name up
+        cursor.execute(
+            f"DELETE FROM dns_domains WHERE application_id NOT IN (SELECT id FROM ({live_claims}) AS live)",
+            live_values
+        )
+        removed = cursor.rowcount
+
+        cursor.execute(live_claims, live_values)
+        rows = cursor.fetchall()
+
+        indexed = 0
+        for application_id, domain_name, status in rows:
+            if not domain_name:
+                continue
+            try:
+                index_domain(cursor, application_id, domain_name, status)
+            except HTTPException as e:
+                if e.status_code == 409:
+                    print(f"Skipping duplicate domain {domain_name!r} of application {application_id}: already claimed by another application")
+                else:
+                    print(f"Skipping invalid domain {domain_name!r} of application {application_id}")
+                continue
+            indexed += 1
+        conn.commit()
+        set_consistency_token(response, cursor)
+    except mysql.connector.Error as e:
+        raise database_error(e)
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {"indexed": indexed, "removed": removed}
+
 # Read by application ID
 @router.get("/{application_id}", response_model=Dict[str, Any])
-async def get_application(application_id: str):
+async def get_application(request: Request, application_id: str):
     print("GET application_id:", application_id)
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(request)
         cursor = conn.cursor(dictionary=True)
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["get"])
         query = "SELECT id, type, base_form, extra_form FROM applications WHERE id = %s"
-        cursor.execute(query, (application_id,))
-        row = cursor.fetchone()
+        row = await run_query(request, conn, cursor, query, (application_id,), fetch="one")
+
+        if not row:
+            # Finished applications may have been moved by the archive job
+            query = "SELECT id, type, base_form, extra_form FROM applications_archive WHERE id = %s"
+            row = await run_query(request, conn, cursor, query, (application_id,), fetch="one")
 
         if not row:
             raise HTTPException(status_code=404, detail="Application not found")
@@ -146,7 +419,7 @@ async def get_application(application_id: str):
         }
 
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
@@ -155,7 +428,7 @@ async def get_application(application_id: str):
 
 # Update by application ID
 @router.put("/{application_id}", response_model=ApplicationResponse)
-async def update_application(application_id: str, updated_data: GeneralApplicationRequest):
+async def update_application(application_id: str, updated_data: GeneralApplicationRequest, response: Response):
     if updated_data.application_type != ApplicationType.dns:
         raise HTTPException(status_code=400, detail="Unsupported application type")
 
@@ -163,10 +436,13 @@ async def update_application(application_id: str, updated_data: GeneralApplicati
         dns_form = dnsApplicationForm(**updated_data.additionForm)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid DNS form: {str(e)}")
+    normalize_domain(dns_form.domain_name)
 
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["update"])
+        check_domain_available(cursor, dns_form.domain_name, exclude_application_id=application_id)
         query = """
             UPDATE applications
             SET type=%s, base_form=%s, extra_form=%s
@@ -179,13 +455,17 @@ async def update_application(application_id: str, updated_data: GeneralApplicati
             application_id
         )
         cursor.execute(query, values)
-        conn.commit()
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Application not found")
 
+        index_domain(cursor, application_id, dns_form.domain_name, updated_data.baseForm.status.value)
+        index_search(cursor, application_id, updated_data.baseForm.dict(), dns_form.dict())
+        conn.commit()
+        set_consistency_token(response, cursor)
+
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
@@ -196,10 +476,11 @@ async def update_application(application_id: str, updated_data: GeneralApplicati
     }
 
 @router.put("/cancel/{application_id}", response_model=ApplicationResponse)
-async def cancel_application(application_id: str):
+async def cancel_application(application_id: str, response: Response):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["status"])
 
         query = """
             UPDATE applications
@@ -209,13 +490,16 @@ async def cancel_application(application_id: str):
         values = (ApplicationStatus.canceled.value, application_id)
 
         cursor.execute(query, values)
-        conn.commit()
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Application not found")
 
+        cursor.execute("DELETE FROM dns_domains WHERE application_id = %s", (application_id,))
+        conn.commit()
+        set_consistency_token(response, cursor)
+
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
@@ -226,10 +510,25 @@ async def cancel_application(application_id: str):
     }
 
 @router.put("/approved/{application_id}", response_model=ApplicationResponse)
-async def approve_application(application_id: str):
+async def approve_application(application_id: str, response: Response):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["status"])
+
+        # Pending requests may overlap each other; approving one must not
+        # create a zone that overlaps another approved zone
+        query = """
+            SELECT type, JSON_UNQUOTE(JSON_EXTRACT(extra_form, '$.domain_name'))
+            FROM applications
+            WHERE id = %s
+            FOR UPDATE
+        """
+        cursor.execute(query, (application_id,))
+        row = cursor.fetchone()
+        domain_name = row[1] if row and row[0] == ApplicationType.dns.value else None
+        if domain_name:
+            check_domain_available(cursor, domain_name, exclude_application_id=application_id, for_update=True)
 
         query = """
             UPDATE applications
@@ -239,13 +538,19 @@ async def approve_application(application_id: str):
         values = (ApplicationStatus.approved.value, application_id)
 
         cursor.execute(query, values)
-        conn.commit()
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Application not found")
 
+        # Reject and cancel drop the index row, so re-create it rather than
+        # assume there is one to update
+        if domain_name:
+            index_domain(cursor, application_id, domain_name, ApplicationStatus.approved.value)
+        conn.commit()
+        set_consistency_token(response, cursor)
+
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
@@ -256,10 +561,11 @@ async def approve_application(application_id: str):
     }
 
 @router.put("/rejected/{application_id}", response_model=ApplicationResponse)
-async def approve_application(application_id: str):
+async def approve_application(application_id: str, response: Response):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["status"])
 
         query = """
             UPDATE applications
@@ -269,13 +575,16 @@ async def approve_application(application_id: str):
         values = (ApplicationStatus.rejected.value, application_id)
 
         cursor.execute(query, values)
-        conn.commit()
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Application not found")
 
+        cursor.execute("DELETE FROM dns_domains WHERE application_id = %s", (application_id,))
+        conn.commit()
+        set_consistency_token(response, cursor)
+
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
@@ -285,21 +594,113 @@ async def approve_application(application_id: str):
         "message": "Application canceled successfully"
     }
 
+# Move finished applications out of the hot table
+# Plain def: FastAPI runs it in the threadpool, so the long batch loop of
+# blocking DB calls doesn't stall the event loop (or the health probes)
+@router.post("/archive", response_model=ArchiveResponse)
+def archive_applications(response: Response, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = 500):
+    if older_than_days < 0 or batch_size <= 0:
+        raise HTTPException(status_code=400, detail="older_than_days must be >= 0 and batch_size > 0")
+
+    cutoff = (date.today() - timedelta(days=older_than_days)).isoformat()
+    status_placeholders = ", ".join(["%s"] * len(TERMINAL_STATUSES))
+    parsed_date = "STR_TO_DATE(JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.apply_date')), '%Y-%m-%d')"
+    archived = 0
+    skipped = 0
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["archive"])
+        # Plain consistent read: no row locks, and keyset paging on the
+        # primary key so each batch continues where the last one stopped.
+        # Rows whose apply_date can't be parsed come back with a NULL date.
+        select_query = f"""
+            SELECT id, JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.apply_date')), {parsed_date}
+            FROM applications
+            WHERE id > %s
+              AND JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.status')) IN ({status_placeholders})
+              AND ({parsed_date} < %s OR {parsed_date} IS NULL)
+            ORDER BY id
+            LIMIT %s
+        """
+        last_id = ""
+        while True:
+            cursor.execute(select_query, (last_id, *TERMINAL_STATUSES, cutoff, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            ids = []
+            for application_id, raw_date, apply_date in rows:
+                # Only canonical YYYY-MM-DD is archived: STR_TO_DATE accepts
+                # trailing text with a warning, which strict mode turns into
+                # an error on INSERT and would fail the batch on every run
+                if apply_date is None or raw_date != apply_date.isoformat():
+                    print(f"Skipping archive of application {application_id}: unparseable apply_date {raw_date!r}")
+                    skipped += 1
+                else:
+                    ids.append(application_id)
+
+            if ids:
+                # Only these rows are touched (through the primary key), and the
+                # status is re-checked in case it changed since the read above
+                id_placeholders = ", ".join(["%s"] * len(ids))
+                recheck = f"id IN ({id_placeholders}) AND JSON_UNQUOTE(JSON_EXTRACT(base_form, '$.status')) IN ({status_placeholders})"
+                cursor.execute(f"""
+                    INSERT INTO applications_archive (id, type, base_form, extra_form, apply_date)
+                    SELECT id, type, base_form, extra_form, {parsed_date}
+                    FROM applications
+                    WHERE {recheck}
+                """, (*ids, *TERMINAL_STATUSES))
+                cursor.execute(f"DELETE FROM applications WHERE {recheck}", (*ids, *TERMINAL_STATUSES))
+                archived += cursor.rowcount
+                cursor.execute(f"""
+                    DELETE s FROM application_search s
+                    LEFT JOIN applications a ON a.id = s.application_id
+                    WHERE s.application_id IN ({id_placeholders}) AND a.id IS NULL
+                """, ids)
+                conn.commit()
+
+            if len(rows) < batch_size:
+                break
+        set_consistency_token(response, cursor)
+
+    except mysql.connector.Error as e:
+        conn.rollback()
+        raise database_error(e)
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        "archived": archived,
+        "skipped": skipped,
+        "cutoff_date": cutoff,
+        "message": f"Archived {archived} applications"
+    }
+
 # Delete by application ID
 @router.delete("/{application_id}", response_model=ApplicationResponse)
-async def delete_application(application_id: str):
+async def delete_application(application_id: str, response: Response):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        set_statement_timeout(cursor, STATEMENT_TIMEOUTS_MS["delete"])
         query = "DELETE FROM applications WHERE id = %s"
         cursor.execute(query, (application_id,))
-        conn.commit()
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Application not found")
 
+        cursor.execute("DELETE FROM dns_domains WHERE application_id = %s", (application_id,))
+        cursor.execute("DELETE FROM application_search WHERE application_id = %s", (application_id,))
+        conn.commit()
+        set_consistency_token(response, cursor)
+
     except mysql.connector.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
     finally:
         cursor.close()
         conn.close()
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+from admission import AdmissionController, AdmissionMiddleware, TokenBucket
+
+def make_client(controller, handler=None, behind_proxy=False):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller, exempt_paths=["/stats"])
+    if behind_proxy:
+        # What `uvicorn --proxy-headers` installs in front of the app
+        app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
+
+    @app.get("/work")
+    async def work():
+        if handler:
+            await handler()
+        return {"ok": True}
+
+    @app.get("/stats")
+    async def stats():
+        return controller.stats()
+
+    return TestClient(app)
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=2, burst=2, now=0)
+    assert bucket.take(0) == 0
+    assert bucket.take(0) == 0
+    assert bucket.take(0) == pytest.approx(0.5)
+    assert bucket.take(0.5) == 0
+
+def test_rate_limit_per_user():
+    controller = AdmissionController(rate=0.1, burst=2, max_concurrency=4)
+    client = make_client(controller)
+
+    for _ in range(2):
+        assert client.get("/work", headers={"X-User-Id": "s123456"}).status_code == 200
+    response = client.get("/work", headers={"X-User-Id": "s123456"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+
+    # Other users and exempt paths are unaffected
+    assert client.get("/work", headers={"X-User-Id": "s789012"}).status_code == 200
+    stats = client.get("/stats", headers={"X-User-Id": "s123456"}).json()
+    assert stats["rate_limited"] == 1
+    assert stats["admitted"] == 3
+
+def test_rate_limit_per_forwarded_client():
+    controller = AdmissionController(rate=0.1, burst=1, max_concurrency=4)
+    client = make_client(controller, behind_proxy=True)
+
+    # Every request arrives from the proxy; the forwarded address tells them apart
+    assert client.get("/work", headers={"X-Forwarded-For": "203.0.113.7"}).status_code == 200
+    assert client.get("/work", headers={"X-Forwarded-For": "203.0.113.7"}).status_code == 429
+    assert client.get("/work", headers={"X-Forwarded-For": "198.51.100.2"}).status_code == 200
+    assert set(controller.buckets) == {"ip:203.0.113.7", "ip:198.51.100.2"}
+
+def test_client_key():
+    assert AdmissionMiddleware._client_key({"headers": [(b"x-user-id", b"s123456")], "client": ("10.0.0.1", 1234)}) == "user:s123456"
+    assert AdmissionMiddleware._client_key({"headers": [], "client": ("10.0.0.1", 1234)}) == "ip:10.0.0.1"
+    # No address to tell clients apart: don't lump them into one bucket
+    assert AdmissionMiddleware._client_key({"headers": [], "client": None}) is None
+
+def test_evicts_least_recently_seen_bucket(monkeypatch):
+    monkeypatch.setattr("admission.MAX_TRACKED_CLIENTS", 2)
+    controller = AdmissionController(rate=1, burst=2)
+    controller.check_rate("a")
+    controller.check_rate("b")
+    controller.check_rate("a")
+    controller.check_rate("c")
+    # "b" was seen least recently, "a" keeps its drained bucket
+    assert list(controller.buckets) == ["a", "c"]
+    assert controller.buckets["a"].tokens < 1
+
+def test_bucket_table_stays_bounded_when_full_of_active_clients(monkeypatch):
+    monkeypatch.setattr("admission.MAX_TRACKED_CLIENTS", 100)
+    monkeypatch.setattr("admission.time.monotonic", lambda: 0.0)
+    controller = AdmissionController(rate=0.001, burst=1)
+    # None of these buckets ever refills, so none is idle
+    for i in range(100):
+        controller.check_rate(f"user-{i}")
+    for i in range(100, 1000):
+        controller.check_rate(f"user-{i}")
+        assert len(controller.buckets) == 100
+    assert list(controller.buckets)[0] == "user-900"
+
+@pytest.mark.asyncio
+async def test_sheds_when_queue_deadline_passes():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+    assert await controller.acquire() is None
+    assert await controller.acquire() == "deadline"
+    controller.release()
+    assert await controller.acquire() is None
+    assert controller.stats()["shed_deadline"] == 1
+
+@pytest.mark.asyncio
+async def test_sheds_when_queue_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=1)
+    assert await controller.acquire() is None
+    waiter = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+    assert await controller.acquire() == "queue_full"
+    controller.release()
+    assert await waiter is None
+    assert controller.stats()["in_flight"] == 1
+
+def test_overload_returns_503():
+    controller = AdmissionController(max_concurrency=0, max_queue=0)
+    client = make_client(controller)
+
+    response = client.get("/work")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/stats").json()["shed_queue_full"] == 1
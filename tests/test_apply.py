@@ -6,7 +6,9 @@ from unittest.mock import MagicMock, patch
 from uuid import uuid4
 import mysql.connector
 import json
-from routers.apply import router, get_db_connection
+import inspect
+from datetime import date, timedelta
+from routers.apply import router, get_db_connection, reverse_domain, parent_zones, build_search_content, build_search_query
 from models import ApplicationForm, ApplicationType, GeneralApplicationRequest, ApplicationStatus, dnsApplicationForm
 
 # Mock application data based on provided fake data
@@ -433,4 +435,401 @@ async def test_db_connection_failure():
         with pytest.raises(HTTPException) as exc:
             get_db_connection()
         assert exc.value.status_code == 500
-        assert "Database connection failed" in exc.value.detail
\ No newline at end of file
+        assert "Database connection failed" in exc.value.detail
+
+@pytest.mark.asyncio
+async def test_get_application_falls_back_to_archive(client, mock_db_connection, mock_application_data):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchone.side_effect = [
+        None,
+        {
+            "id": mock_application_data["id"],
+            "type": mock_application_data["type"],
+            "base_form": json.dumps(mock_application_data["base_form"]),
+            "extra_form": json.dumps(mock_application_data["extra_form"])
+        }
+    ]
+
+    response = client.get(f"/{mock_application_data['id']}")
+    assert response.status_code == 200
+    assert response.json()["base"] == mock_application_data["base_form"]
+    assert "applications_archive" in mock_cursor.execute.call_args_list[-1][0][0]
+
+@pytest.mark.asyncio
+async def test_get_all_applications_include_archived(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/getAll?include_archived=true")
+    assert response.status_code == 200
+    assert "UNION ALL" in mock_cursor.execute.call_args[0][0]
+
+    response = client.get("/getAll")
+    assert "applications_archive" not in mock_cursor.execute.call_args[0][0]
+
+@pytest.mark.asyncio
+async def test_get_applications_by_user_include_archived(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/my-applications?include_archived=true", headers={"X-User-Id": "s123456"})
+    assert response.status_code == 200
+    query, values = mock_cursor.execute.call_args[0]
+    archive_part = query.split("UNION ALL")[1]
+    assert "applications_archive" in archive_part
+    assert "WHERE applicant_account = %s" in archive_part
+    assert "JSON_EXTRACT" not in archive_part
+    assert values == ("s123456", "s123456")
+
+@pytest.mark.asyncio
+async def test_archive_applications_success(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.side_effect = [
+        [("id-1", "2024-01-02", date(2024, 1, 2)), ("id-2", "2024-01-03", date(2024, 1, 3))],
+        [("id-3", "2024-02-01", date(2024, 2, 1))],
+    ]
+    mock_cursor.rowcount = 2
+
+    response = client.post("/archive?older_than_days=30&batch_size=2")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["archived"] == 4
+    assert body["skipped"] == 0
+    cutoff = (date.today() - timedelta(days=30)).isoformat()
+    assert body["cutoff_date"] == cutoff
+    assert mock_connection.commit.call_count == 2
+
+    calls = [call[0] for call in mock_cursor.execute.call_args_list]
+    selects = [call for call in calls if call[0].lstrip().startswith("SELECT id")]
+    # Keyset paging without row locks, filtered on terminal status and parsed date
+    assert "FOR UPDATE" not in selects[0][0]
+    assert "STR_TO_DATE" in selects[0][0]
+    assert selects[0][1] == ("", "Completed", "Rejected", "Canceled", cutoff, 2)
+    assert selects[1][1][0] == "id-2"
+
+    inserts = [call for call in calls if "INSERT INTO applications_archive" in call[0]]
+    assert inserts[0][1] == ("id-1", "id-2", "Completed", "Rejected", "Canceled")
+    deletes = [call for call in calls if call[0].startswith("DELETE FROM applications WHERE")]
+    assert "'$.status'" in deletes[0][0]
+    assert deletes[1][1] == ("id-3", "Completed", "Rejected", "Canceled")
+    search_deletes = [call for call in calls if "DELETE s FROM application_search" in call[0]]
+    assert search_deletes[0][1] == ["id-1", "id-2"]
+    assert search_deletes[1][1] == ["id-3"]
+    mock_cursor.close.assert_called()
+    mock_connection.close.assert_called()
+
+@pytest.mark.asyncio
+async def test_archive_applications_skips_malformed_date(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.side_effect = [[
+        ("id-1", "20/05/2024", None),
+        ("id-2", "2024-05-20 noon", date(2024, 5, 20)),
+        ("id-3", "2024-05-21", date(2024, 5, 21)),
+    ]]
+    mock_cursor.rowcount = 1
+
+    response = client.post("/archive?batch_size=10")
+    assert response.status_code == 200
+    assert response.json()["archived"] == 1
+    assert response.json()["skipped"] == 2
+    inserts = [call[0] for call in mock_cursor.execute.call_args_list if "INSERT INTO applications_archive" in call[0][0]]
+    assert inserts[0][1][0] == "id-3"
+    assert len(inserts) == 1
+
+@pytest.mark.asyncio
+async def test_archive_applications_nothing_to_do(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    response = client.post("/archive")
+    assert response.status_code == 200
+    assert response.json()["archived"] == 0
+    mock_connection.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_archive_applications_invalid_params(client):
+    response = client.post("/archive?batch_size=0")
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_archive_applications_db_error(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.execute.side_effect = mysql.connector.Error("DB Error")
+
+    response = client.post("/archive")
+    assert response.status_code == 500
+    assert "Database error" in response.json()["detail"]
+    mock_connection.rollback.assert_called()
+
+def test_reverse_domain():
+    assert reverse_domain("Lab.IE.example.edu.") == "edu.example.ie.lab."
+    assert parent_zones("lab.ie.example.edu") == ["edu.", "edu.example.", "edu.example.ie."]
+    with pytest.raises(HTTPException) as exc:
+        reverse_domain("bad..example.edu")
+    assert exc.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_get_domain_conflicts(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = [
+        ("id-1", "lab.ie.example.edu", "edu.example.ie.lab.", "Pending"),
+        ("id-2", "ie.example.edu", "edu.example.ie.", "Approved"),
+        ("id-3", "gpu.lab.ie.example.edu", "edu.example.ie.lab.gpu.", "Pending"),
+    ]
+
+    response = client.get("/domain-conflicts?domain_name=LAB.ie.example.edu")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["domain_name"] == "lab.ie.example.edu"
+    assert [c["application_id"] for c in body["exact"]] == ["id-1"]
+    assert [c["application_id"] for c in body["parent_zones"]] == ["id-2"]
+    assert [c["application_id"] for c in body["subdomains"]] == ["id-3"]
+
+@pytest.mark.asyncio
+async def test_create_application_domain_conflict(client, mock_db_connection, sample_request):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = [
+        ("id-1", "example.edu", "edu.example.", "Approved"),
+    ]
+
+    response = client.post("/create", json=sample_request.dict())
+    assert response.status_code == 409
+    assert "overlaps approved zone example.edu" in response.json()["detail"]
+    mock_connection.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_create_application_pending_parent_is_not_conflict(client, mock_db_connection, sample_request):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = [
+        ("id-1", "example.edu", "edu.example.", "Pending"),
+    ]
+
+    response = client.post("/create", json=sample_request.dict())
+    assert response.status_code == 200
+    inserted = [call[0] for call in mock_cursor.execute.call_args_list if "INSERT INTO dns_domains" in call[0][0]]
+    assert inserted[0][1][1:] == ("cs.example.edu", "edu.example.cs.", "Pending")
+
+@pytest.mark.asyncio
+async def test_cancel_application_releases_domain(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.rowcount = 1
+
+    response = client.put("/cancel/1e7d439a-d61b-43a5-a97c-50a8df120001")
+    assert response.status_code == 200
+    queries = [call[0][0] for call in mock_cursor.execute.call_args_list]
+    assert any("DELETE FROM dns_domains" in query for query in queries)
+
+def test_build_search_content(mock_application_data):
+    content = build_search_content(mock_application_data["base_form"], mock_application_data["extra_form"])
+    assert "Alice Chen" in content
+    assert "cs.example.edu" in content
+    assert "Hosting department web portal" in content
+    assert "0912345678" not in content
+
+def test_build_search_query():
+    assert build_search_query("alice  portal") == "+alice* +portal*"
+    assert build_search_query('-alice +"portal"') == "+alice* +portal*"
+    assert build_search_query("***") == ""
+
+@pytest.mark.asyncio
+async def test_search_applications_success(client, mock_db_connection, mock_application_data):
+    mock_connection, mock_cursor = mock_db_connection
+    row = {
+        "id": mock_application_data["id"],
+        "type": mock_application_data["type"],
+        "base_form": json.dumps(mock_application_data["base_form"]),
+        "extra_form": json.dumps(mock_application_data["extra_form"]),
+        "score": 1.5
+    }
+    mock_cursor.fetchall.return_value = [row, row]
+
+    response = client.get("/search?q=alice&page_size=1")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["has_more"] is True
+    assert len(body["results"]) == 1
+    assert body["results"][0]["application_id"] == mock_application_data["id"]
+    assert body["results"][0]["score"] == 1.5
+    values = mock_cursor.execute.call_args[0][1]
+    assert values == ("+alice*", "+alice*", 2, 0)
+
+@pytest.mark.asyncio
+async def test_search_applications_short_label_domain(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/search?q=lab.ie.example.edu")
+    assert response.status_code == 200
+    # Every label stays required, short ones included; the index is built
+    # with innodb_ft_min_token_size = 1 and no stopwords (fake_data/search.sql)
+    values = mock_cursor.execute.call_args[0][1]
+    assert values[0] == "+lab* +ie* +example* +edu*"
+    assert build_search_query("CS Department") == "+CS* +Department*"
+    assert build_search_query("www.x.com") == "+www* +x* +com*"
+
+@pytest.mark.asyncio
+async def test_search_applications_invalid_query(client):
+    assert client.get("/search?q=+-").status_code == 400
+    assert client.get("/search?q=alice&page=0").status_code == 400
+    assert client.get("/search?q=alice&page_size=1000").status_code == 400
+
+@pytest.mark.asyncio
+async def test_search_applications_db_error(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.execute.side_effect = mysql.connector.Error("DB Error")
+
+    response = client.get("/search?q=alice")
+    assert response.status_code == 500
+    assert "Database error" in response.json()["detail"]
+
+@pytest.mark.asyncio
+async def test_create_application_indexes_search(client, mock_db_connection, sample_request):
+    mock_connection, mock_cursor = mock_db_connection
+
+    response = client.post("/create", json=sample_request.dict())
+    assert response.status_code == 200
+    search_calls = [call[0] for call in mock_cursor.execute.call_args_list if "application_search" in call[0][0]]
+    assert "Alice Chen" in search_calls[0][1][1]
+
+@pytest.mark.asyncio
+async def test_write_returns_consistency_token(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.rowcount = 1
+    mock_cursor.fetchone.return_value = ("3e11fa47-71ca-11e1-9e33-c80aa9429562", "3e11fa47-71ca-11e1-9e33-c80aa9429562:1-5")
+
+    response = client.delete("/1e7d439a-d61b-43a5-a97c-50a8df120001")
+    assert response.status_code == 200
+    assert response.headers["X-Consistency-Token"] == "3e11fa47-71ca-11e1-9e33-c80aa9429562:1-5"
+
+@pytest.mark.asyncio
+async def test_read_uses_replica_with_consistency_token(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    token = "3e11fa47-71ca-11e1-9e33-c80aa9429562:1-5"
+    with patch('routers.apply.get_db_connection', return_value=mock_connection) as get_conn:
+        client.get("/getAll", headers={"X-Consistency-Token": token})
+    get_conn.assert_called_once_with(read_only=True, consistency_token=token)
+
+@pytest.mark.asyncio
+async def test_read_ignores_malformed_consistency_token(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    with patch('routers.apply.get_db_connection', return_value=mock_connection) as get_conn:
+        client.get("/getAll", headers={"X-Consistency-Token": "') OR 1=1 --"})
+    get_conn.assert_called_once_with(read_only=True, consistency_token=None)
+
+@pytest.mark.asyncio
+async def test_get_all_applications_timeout(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.side_effect = mysql.connector.Error("maximum statement execution time exceeded", errno=3024)
+
+    response = client.get("/getAll")
+    assert response.status_code == 504
+    timeout_call = mock_cursor.execute.call_args_list[0][0]
+    assert "MAX_EXECUTION_TIME" in timeout_call[0]
+    assert timeout_call[1] == (10000, 10)
+
+@pytest.mark.asyncio
+async def test_approve_application_blocked_by_approved_parent(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.rowcount = 1
+    mock_cursor.fetchone.return_value = ("DNS", "cs.example.edu")
+    mock_cursor.fetchall.return_value = [
+        ("id-1", "example.edu", "edu.example.", "Approved"),
+    ]
+
+    response = client.put("/approved/1e7d439a-d61b-43a5-a97c-50a8df120001")
+    assert response.status_code == 409
+    assert "overlaps approved zone example.edu" in response.json()["detail"]
+    queries = [call[0][0] for call in mock_cursor.execute.call_args_list]
+    assert not any("UPDATE applications" in query for query in queries)
+    conflict_query, conflict_values = [call[0] for call in mock_cursor.execute.call_args_list if "FROM dns_domains" in call[0][0]][0]
+    assert "FOR UPDATE" in conflict_query
+    assert conflict_values[-1] == "1e7d439a-d61b-43a5-a97c-50a8df120001"
+    mock_connection.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_approve_application_blocked_by_approved_subdomain(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.rowcount = 1
+    mock_cursor.fetchone.return_value = ("DNS", "example.edu")
+    mock_cursor.fetchall.return_value = [
+        ("id-2", "cs.example.edu", "edu.example.cs.", "Approved"),
+    ]
+
+    response = client.put("/approved/1e7d439a-d61b-43a5-a97c-50a8df120001")
+    assert response.status_code == 409
+    assert "overlaps approved zone cs.example.edu" in response.json()["detail"]
+    mock_connection.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_approve_application_pending_overlap_allowed(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.rowcount = 1
+    mock_cursor.fetchone.return_value = ("DNS", "example.edu")
+    mock_cursor.fetchall.return_value = [
+        ("id-2", "cs.example.edu", "edu.example.cs.", "Pending"),
+    ]
+
+    response = client.put("/approved/1e7d439a-d61b-43a5-a97c-50a8df120001")
+    assert response.status_code == 200
+    inserted = [call[0][1] for call in mock_cursor.execute.call_args_list if "INSERT INTO dns_domains" in call[0][0]]
+    assert inserted == [("1e7d439a-d61b-43a5-a97c-50a8df120001", "example.edu", "edu.example.", "Approved")]
+    mock_connection.commit.assert_called()
+
+@pytest.mark.asyncio
+async def test_approve_after_reject_reindexes_domain(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.rowcount = 1
+    app_id = "1e7d439a-d61b-43a5-a97c-50a8df120001"
+
+    response = client.put(f"/rejected/{app_id}")
+    assert response.status_code == 200
+    queries = [call[0][0] for call in mock_cursor.execute.call_args_list]
+    assert any(query.startswith("DELETE FROM dns_domains") for query in queries)
+
+    mock_cursor.execute.reset_mock()
+    mock_cursor.fetchone.return_value = ("DNS", "cs.example.edu")
+    mock_cursor.fetchall.return_value = []
+    response = client.put(f"/approved/{app_id}")
+    assert response.status_code == 200
+    inserted = [call[0][1] for call in mock_cursor.execute.call_args_list if "INSERT INTO dns_domains" in call[0][0]]
+    assert inserted == [(app_id, "cs.example.edu", "edu.example.cs.", "Approved")]
+
+@pytest.mark.asyncio
+async def test_rebuild_domain_index(client, mock_db_connection):
+    mock_connection, mock_cursor = mock_db_connection
+    mock_cursor.rowcount = 3
+    mock_cursor.fetchall.return_value = [
+        ("id-1", "cs.example.edu", "Approved"),
+        ("id-2", "old.example.edu", "Completed"),
+        ("id-3", "bad..example.edu", "Pending"),
+        ("id-4", "cs.example.edu", "Pending"),
+    ]
+
+    def execute(query, values=None):
+        if "INSERT INTO dns_domains" in query and values[0] == "id-4":
+            raise mysql.connector.IntegrityError("Duplicate entry")
+    mock_cursor.execute.side_effect = execute
+
+    with patch("builtins.print") as log:
+        response = client.post("/domain-conflicts/rebuild")
+    assert response.status_code == 200
+    assert response.json() == {"indexed": 2, "removed": 3}
+
+    calls = [call[0] for call in mock_cursor.execute.call_args_list]
+    orphan_query, orphan_values = [call for call in calls if call[0].startswith("DELETE FROM dns_domains WHERE application_id NOT IN")][0]
+    assert "applications_archive" in orphan_query
+    assert orphan_values == ("DNS", "Rejected", "Canceled") * 2
+    messages = [call[0][0] for call in log.call_args_list]
+    assert any("invalid domain 'bad..example.edu'" in message for message in messages)
+    assert any("duplicate domain 'cs.example.edu' of application id-4" in message for message in messages)
+    mock_connection.commit.assert_called()
+
+def test_long_maintenance_jobs_run_in_threadpool():
+    # Blocking batch loops must not run on the event loop
+    from routers.apply import archive_applications, rebuild_domain_index
+    assert not inspect.iscoroutinefunction(archive_applications)
+    assert not inspect.iscoroutinefunction(rebuild_domain_index)
@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+import main
+
+def test_lifespan_warms_up_and_becomes_ready():
+    with patch("database.warm_up_pools") as warm_up_pools, \
+         patch("database.ping_primary", return_value=True):
+        assert main.app.state.ready is False
+        with TestClient(main.app) as client:
+            warm_up_pools.assert_called_once()
+            assert client.get("/healthz").json() == {"status": "ok"}
+            response = client.get("/readyz")
+            assert response.status_code == 200
+            assert response.json() == {"status": "ready"}
+        assert main.app.state.ready is False
+
+def test_readyz_reports_unreachable_database():
+    with patch("database.warm_up_pools"), \
+         patch("database.ping_primary", return_value=False):
+        with TestClient(main.app) as client:
+            assert client.get("/healthz").status_code == 200
+            response = client.get("/readyz")
+            assert response.status_code == 503
+            assert response.json() == {"status": "database unreachable"}
+
+def test_readyz_before_startup():
+    # Without the lifespan (no context manager) warmup never ran
+    client = TestClient(main.app)
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json() == {"status": "starting"}
+
+def test_warm_up_validators():
+    main.warm_up_validators()